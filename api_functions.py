@@ -2,9 +2,18 @@
 
 from googleapiclient.discovery import build
 from datetime import datetime, timedelta
+import os
 import re
 import pandas as pd
 
+# Refresh policy of the video metadata cache: how long each part of the videos resource is kept
+# before it is fetched again. Titles and categories rarely change, statistics do every day.
+VIDEO_METADATA_MAX_AGE = {
+    'snippet': timedelta(days=30),
+    'contentDetails': timedelta(days=365),
+    'statistics': timedelta(days=1)
+}
+
 def parse_published_at(published_at_str):
     """
     Parses the 'publishedAt' string into a datetime.date object.
@@ -361,3 +370,136 @@ def get_analytics_data_per_video(api_client, videoId: str, startDate: str, endDa
     analytics_df['videoId'] = videoId
 
     return analytics_df
+
+
+def parse_video_part(item, part: str):
+    """
+    Extract the cached fields of one part of a video resource.
+
+    Args:
+        item (dict): A video resource as returned by videos().list.
+        part (str): One of 'snippet', 'contentDetails' or 'statistics'.
+
+    Returns:
+        dict: The fields of the part, e.g. 'title' for the snippet.
+    """
+    if part == 'snippet':
+        return {
+            'title': item['snippet']['title'],
+            'channelId': item['snippet']['channelId'],
+            'categoryId': item['snippet']['categoryId'],
+            'publishedAt': parse_published_at(item['snippet']['publishedAt'])
+        }
+    if part == 'contentDetails':
+        return {'duration': parse_duration(item['contentDetails']['duration'])}
+    if part == 'statistics':
+        return {
+            'viewCount': int(item['statistics'].get('viewCount', 0)),
+            'likeCount': int(item['statistics'].get('likeCount', 0)),
+            'commentCount': int(item['statistics'].get('commentCount', 0))
+        }
+    raise ValueError(f"Unknown part '{part}'")
+
+
+def load_video_metadata(path: str):
+    """
+    Load the local video metadata cache.
+
+    Args:
+        path (str): Path of the pickled cache.
+
+    Returns:
+        pandas.DataFrame: Video metadata indexed by video ID, empty if the cache does not exist yet.
+    """
+    if os.path.exists(path):
+        return pd.read_pickle(path)
+    return pd.DataFrame(index=pd.Index([], name='videoId'))
+
+
+def refresh_video_metadata(api_client, cache, video_ids, max_age=VIDEO_METADATA_MAX_AGE, now=None):
+    """
+    Fetch the parts of video metadata which are missing or stale for the given videos.
+
+    Every part has its own fetch time ('<part>_fetchedAt') in the cache, so e.g. only the
+    statistics are requested for videos whose snippet is still fresh. Videos which need the
+    same parts are requested together in batches of 50 IDs per call.
+
+    Args:
+        api_client: An initialized instance of the YouTube API client.
+        cache (pandas.DataFrame): The cache as returned by `load_video_metadata`.
+        video_ids (list): IDs of the videos the metadata is needed for.
+        max_age (dict): Maximum age per part, see VIDEO_METADATA_MAX_AGE.
+        now (datetime, optional): The current time, mainly for testing.
+
+    Returns:
+        pandas.DataFrame: The updated cache.
+    """
+    now = now or datetime.now()
+    records = cache.to_dict('index')
+
+    # Group the videos by the parts which need to be fetched for them
+    ids_by_parts = {}
+    for video_id in video_ids:
+        record = records.get(video_id, {})
+        stale_parts = tuple(part for part, age in max_age.items()
+                            if pd.isna(record.get(f'{part}_fetchedAt')) or now - record[f'{part}_fetchedAt'] > age)
+        if stale_parts:
+            ids_by_parts.setdefault(stale_parts, []).append(video_id)
+
+    if not ids_by_parts:
+        return cache
+
+    for parts, ids in ids_by_parts.items():
+        for i in range(0, len(ids), 50):
+            batch = ids[i:i + 50]
+            response = api_client.videos().list(
+                part=','.join(parts),
+                id=','.join(batch),
+                maxResults=50
+            ).execute()
+
+            for item in response['items']:
+                record = records.setdefault(item['id'], {})
+                for part in parts:
+                    record.update(parse_video_part(item, part))
+
+            # Videos which were not returned (deleted or private) are not requested again until the parts expire
+            for video_id in batch:
+                record = records.setdefault(video_id, {})
+                for part in parts:
+                    record[f'{part}_fetchedAt'] = now
+
+    cache = pd.DataFrame.from_dict(records, orient='index')
+    cache.index.name = 'videoId'
+    return cache
+
+
+def enrich_with_video_metadata(df, api_client, path='video_metadata.pkl', id_col='video_id', columns=None,
+                               max_age=VIDEO_METADATA_MAX_AGE):
+    """
+    Join video metadata such as title, duration and category onto report rows.
+
+    The metadata is kept in a local cache, only missing or stale parts are fetched from the API.
+
+    Args:
+        df (pandas.DataFrame): Report rows with a column of video IDs.
+        api_client: An initialized instance of the YouTube API client.
+        path (str): Path of the pickled cache.
+        id_col (str): The column of `df` holding the video IDs.
+        columns (list, optional): The metadata columns to add, all by default.
+        max_age (dict): Maximum age per part, see VIDEO_METADATA_MAX_AGE.
+
+    Returns:
+        pandas.DataFrame: `df` with the metadata columns added.
+    """
+    video_ids = [video_id for video_id in df[id_col].dropna().unique() if video_id != 'nan']
+
+    cache = load_video_metadata(path)
+    if video_ids:
+        cache = refresh_video_metadata(api_client, cache, video_ids, max_age)
+        cache.to_pickle(path)
+
+    if columns is None:
+        columns = [col for col in cache.columns if not col.endswith('_fetchedAt')]
+
+    return df.merge(cache[columns], left_on=id_col, right_index=True, how='left')
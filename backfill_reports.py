@@ -0,0 +1,280 @@
+"""
+Command-line backfill of YouTube Reporting API reports into DynamoDB.
+
+Uses the same ingest code as the Lambda function (lambda_function.py), but
+spreads the full backlog of reports over a pool of worker processes, each
+with its own share of the API quota. Progress is checkpointed in the
+`reports` table exactly like in the Lambda, so backfill and scheduled runs
+can be interrupted and resumed in any order.
+
+Example:
+    python backfill_reports.py payload.json --workers 4
+    python backfill_reports.py payload.json --token-file token.pickle --dry-run
+
+The payload file has the same format as the Lambda payload (see jobs.txt),
+either with the jobs of one channel or with a list of channels, each with its
+own secret and jobs.
+"""
+
+import argparse
+import json
+import os
+import pickle
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+from google.auth.transport.requests import Request
+from google.oauth2.credentials import Credentials
+from googleapiclient.discovery import build
+
+import lambda_function
+
+# Per-process credentials and quota share of every channel and the DynamoDB pool, set up by init_worker
+worker_credentials = None
+worker_quota_share = None
+worker_pool = None
+# Per-process YouTube Reporting API clients and quota limiters, one per channel, created on first use
+worker_clients = {}
+worker_limiters = {}
+
+
+def load_credentials(token_file=None, secret_name=None, aws_region=None):
+    """
+    Load OAuth credentials from a local token file or the SSM Parameter Store.
+
+    Args:
+        token_file (str): Path to a pickled credentials file as written by setup_dynamodb.ipynb.
+        secret_name (str): Name of the parameter in the SSM Parameter Store.
+        aws_region (str): AWS region of the parameter.
+
+    Returns:
+        google.oauth2.credentials.Credentials: Valid (refreshed if necessary) credentials.
+    """
+    if token_file:
+        with open(token_file, 'rb') as token:
+            credentials = pickle.load(token)
+        if credentials.expired and credentials.refresh_token:
+            credentials.refresh(Request())
+        return credentials
+
+    return lambda_function.get_credentials(secret_name, aws_region)
+
+
+def init_worker(credentials_json, quota_share):
+    """
+    Set up a worker process with the credentials of all channels and its quota share.
+
+    Args:
+        credentials_json (list): Serialized OAuth credentials, one per channel.
+        quota_share (int): Number of API requests per minute this worker may issue per channel.
+    """
+    global worker_credentials, worker_quota_share, worker_pool
+    worker_credentials = credentials_json
+    worker_quota_share = quota_share
+    # A fresh pool, connections inherited from the parent process must not be shared
+    worker_pool = lambda_function.DynamoDBPool()
+    lambda_function.dynamodb_pool = worker_pool
+
+
+def get_worker_client(channel_index):
+    """
+    Get the API client and quota limiter of a channel inside a worker process.
+    """
+    if channel_index not in worker_clients:
+        credentials = Credentials.from_authorized_user_info(json.loads(worker_credentials[channel_index]))
+        worker_clients[channel_index] = build('youtubereporting', 'v1', credentials=credentials)
+        worker_limiters[channel_index] = lambda_function.QuotaLimiter(worker_quota_share)
+    return worker_clients[channel_index], worker_limiters[channel_index]
+
+
+def ingest_work_item(channel_index, params, report, checkpoint):
+    """
+    Ingest a single report inside a worker process.
+
+    Returns:
+        tuple: The report ID and the number of rows added.
+    """
+    youtube_client, limiter = get_worker_client(channel_index)
+    rows_added, _ = lambda_function.ingest_job_report(report, params, youtube_client, worker_pool, checkpoint,
+                                                      limiter=limiter)
+    return report['id'], rows_added
+
+
+def collect_backlog(youtube_clients, channels):
+    """
+    List all reports of all jobs of all channels that have not been fully ingested yet.
+
+    Args:
+        youtube_clients (list): Initialized YouTube Reporting API clients, one per channel.
+        channels (list): The channels, each with its jobs mapped to their table parameters, as in the Lambda payload.
+
+    Returns:
+        list: Tuples of channel index, job ID, report and checkpoint (None for reports never started),
+              interleaved across jobs so that every worker gets a mix of tables.
+    """
+    pool = lambda_function.get_dynamodb_pool()
+    backlog_per_job = []
+
+    for channel_index, (youtube_client, channel) in enumerate(zip(youtube_clients, channels)):
+        for job_id in channel['jobs']:
+            pending_reports = lambda_function.list_pending_reports(youtube_client, job_id, pool)
+            backlog_per_job.append([(channel_index, job_id, report, checkpoint)
+                                    for report, checkpoint in pending_reports])
+
+    backlog = []
+    for position in range(max((len(items) for items in backlog_per_job), default=0)):
+        backlog.extend(items[position] for items in backlog_per_job if position < len(items))
+    return backlog
+
+
+def get_table_names(channels):
+    """
+    List the tables of all jobs of all channels, each table once.
+    """
+    return list(dict.fromkeys(params['table_name'] for channel in channels for params in channel['jobs'].values()))
+
+
+def print_backlog(backlog, channels):
+    """
+    Print what a backfill would ingest, grouped by table.
+    """
+    new_reports = defaultdict(int)
+    resumed_reports = defaultdict(int)
+    for channel_index, job_id, report, checkpoint in backlog:
+        table_name = channels[channel_index]['jobs'][job_id]['table_name']
+        if checkpoint:
+            resumed_reports[table_name] += 1
+        else:
+            new_reports[table_name] += 1
+
+    for table_name in get_table_names(channels):
+        print(f"{table_name}: {new_reports[table_name]} new reports, {resumed_reports[table_name]} to resume")
+    print(f"{len(backlog)} reports would be ingested.")
+
+
+def print_item_format_report(youtube_clients, backlog, channels):
+    """
+    Download the first pending report of every job and print the average item size and
+    write capacity units per item format, without writing anything to DynamoDB.
+    """
+    sampled_jobs = set()
+    for channel_index, job_id, report, _ in backlog:
+        if (channel_index, job_id) in sampled_jobs:
+            continue
+        sampled_jobs.add((channel_index, job_id))
+        params = channels[channel_index]['jobs'][job_id]
+
+        local_file = os.path.join(tempfile.gettempdir(), f"{report['id']}.csv")
+        lambda_function.download_report(youtube_clients[channel_index], report['downloadUrl'], local_file)
+        df = pd.read_csv(local_file)
+        os.remove(local_file)
+        if df.empty:
+            continue
+
+        df = lambda_function.prepare_report(df, report, params['composite_key_cols'], params['decimal_cols'])
+        print(f"\n{params['table_name']} (report {report['id']}, {len(df)} rows)")
+        print(lambda_function.compare_item_formats(df, params['composite_key_cols']).to_string())
+
+
+def run_backfill(backlog, channels, credentials, workers):
+    """
+    Ingest the backlog with a pool of worker processes sharing the API quota of every channel.
+
+    Returns:
+        dict: Summary with the number of reports and rows per table and the failed reports.
+    """
+    quota_share = max(1, lambda_function.quota_per_minute // workers)
+    reports_done = defaultdict(int)
+    rows_added = defaultdict(int)
+    failed = []
+    start_time = time.time()
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                             initargs=([c.to_json() for c in credentials], quota_share)) as executor:
+        futures = {}
+        for channel_index, job_id, report, checkpoint in backlog:
+            params = channels[channel_index]['jobs'][job_id]
+            future = executor.submit(ingest_work_item, channel_index, params, report, checkpoint)
+            futures[future] = (params['table_name'], report['id'])
+
+        for done_count, future in enumerate(as_completed(futures), start=1):
+            table_name, report_id = futures[future]
+            try:
+                _, rows = future.result()
+                reports_done[table_name] += 1
+                rows_added[table_name] += rows
+            except Exception as e:
+                failed.append((table_name, report_id, repr(e)))
+            elapsed = time.time() - start_time
+            print(f"[{done_count}/{len(futures)}] {table_name} {report_id} after {elapsed:.0f}s", flush=True)
+
+    return {
+        'reports': dict(reports_done),
+        'rows': dict(rows_added),
+        'failed': failed,
+        'seconds': time.time() - start_time
+    }
+
+
+def print_summary(summary, channels):
+    """
+    Print the final summary of a backfill run.
+    """
+    print("\nSummary")
+    for table_name in get_table_names(channels):
+        print(f"{table_name}: {summary['reports'].get(table_name, 0)} reports, "
+              f"{summary['rows'].get(table_name, 0)} rows added")
+    print(f"Finished in {summary['seconds']:.0f} seconds.")
+    for table_name, report_id, error in summary['failed']:
+        print(f"FAILED {table_name} {report_id}: {error}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backfill YouTube Reporting API reports into DynamoDB.")
+    parser.add_argument('payload', help="JSON file in the format of the Lambda payload "
+                                        "(jobs, secret_name, aws_region or a list of channels).")
+    parser.add_argument('--workers', type=int, default=4, help="Number of worker processes (default: 4).")
+    parser.add_argument('--token-file', help="Use pickled local credentials instead of the SSM Parameter Store "
+                                             "(single-channel payloads only).")
+    parser.add_argument('--secret-name', help="Overrides secret_name of the payload (single-channel payloads only).")
+    parser.add_argument('--aws-region', help="Overrides aws_region of the payload (of all channels).")
+    parser.add_argument('--dry-run', action='store_true', help="Only report what would be ingested.")
+    parser.add_argument('--item-report', action='store_true',
+                        help="Compare item sizes and WCUs (with index writes) of the item formats on one report per job and exit.")
+    args = parser.parse_args(argv)
+
+    with open(args.payload) as f:
+        payload = json.load(f)
+    channels = lambda_function.get_channels(payload)
+
+    if len(channels) > 1 and (args.token_file or args.secret_name):
+        parser.error("--token-file and --secret-name only apply to single-channel payloads.")
+
+    credentials = [load_credentials(args.token_file,
+                                    args.secret_name or channel['secret_name'],
+                                    args.aws_region or channel['aws_region'])
+                   for channel in channels]
+    youtube_clients = [build('youtubereporting', 'v1', credentials=c) for c in credentials]
+
+    backlog = collect_backlog(youtube_clients, channels)
+    print_backlog(backlog, channels)
+
+    if args.item_report:
+        print_item_format_report(youtube_clients, backlog, channels)
+        return 0
+
+    if args.dry_run or not backlog:
+        return 0
+
+    summary = run_backfill(backlog, channels, credentials, args.workers)
+    print_summary(summary, channels)
+
+    return 1 if summary['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
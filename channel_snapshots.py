@@ -0,0 +1,337 @@
+# channel_snapshots.py
+"""
+Daily statistics snapshots of YouTube channels and their videos.
+
+Keeps a time series of viewCount/subscriberCount/videoCount per channel and of
+viewCount/likeCount/commentCount per video in a compact local store. Rows are only
+added when a value changed, and are saved column by column as per-entity deltas
+in a compressed .npz file.
+
+Meant to be scheduled once a day, e.g. with cron:
+    python channel_snapshots.py dragon_channels.txt mixed_channels.txt --token-file token.pickle
+"""
+
+import argparse
+import json
+import os
+import pickle
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from google.auth.transport.requests import Request
+from googleapiclient.discovery import build
+
+from api_functions import get_channel_data_from_handle, get_playlist_items_from_id
+
+CHANNEL_METRICS = ['viewCount', 'subscriberCount', 'videoCount']
+VIDEO_METRICS = ['viewCount', 'likeCount', 'commentCount']
+METRICS = {'channels': CHANNEL_METRICS, 'videos': VIDEO_METRICS}
+
+
+def empty_snapshots():
+    """
+    Create an empty snapshot store.
+
+    Returns:
+        dict: 'channels' and 'videos' DataFrames with the columns id, day and the metrics, and
+              'meta' with the channel IDs per handle, uploads playlists, videos per channel and ETags.
+    """
+    snapshots = {kind: pd.DataFrame({'id': pd.Series(dtype=object), 'day': pd.Series(dtype='datetime64[s]'),
+                                     **{metric: pd.Series(dtype='int64') for metric in metrics}})
+                 for kind, metrics in METRICS.items()}
+    snapshots['meta'] = {'handles': {}, 'uploads': {}, 'videos': {}, 'etags': {}}
+    return snapshots
+
+
+def encode_deltas(df, metrics):
+    """
+    Encode a snapshot table as columnar arrays of per-entity deltas.
+
+    Args:
+        df (pandas.DataFrame): Snapshot rows with the columns id, day and the metrics.
+        metrics (list): The metric columns.
+
+    Returns:
+        dict: The entity IDs, the number of rows per entity and per column the differences
+              to the previous row of the same entity (the first row of an entity is stored as is).
+    """
+    df = df.sort_values(['id', 'day'])
+    ids, counts = np.unique(df['id'].to_numpy(dtype=str), return_counts=True)
+    first_rows = np.zeros(len(df), dtype=bool)
+    first_rows[np.cumsum(counts) - counts] = True
+
+    arrays = {'ids': ids, 'counts': counts.astype(np.int32)}
+    columns = {'day': df['day'].to_numpy().astype('datetime64[D]').astype(np.int64)}
+    columns.update({metric: df[metric].to_numpy(dtype=np.int64) for metric in metrics})
+    for name, values in columns.items():
+        deltas = np.diff(values, prepend=0)
+        deltas[first_rows] = values[first_rows]
+        arrays[name] = deltas
+    return arrays
+
+
+def decode_deltas(arrays, metrics):
+    """
+    Restore a snapshot table from the arrays written by `encode_deltas`.
+    """
+    counts = arrays['counts'].astype(np.int64)
+    entity = np.repeat(np.arange(len(counts)), counts)
+    starts = np.cumsum(counts) - counts
+
+    columns = {}
+    for name in ['day'] + metrics:
+        totals = np.cumsum(arrays[name])
+        # Remove the running total of the previous entities
+        offsets = np.concatenate([[0], totals[starts[1:] - 1]]) if len(counts) else np.zeros(0, dtype=np.int64)
+        columns[name] = totals - np.repeat(offsets, counts)
+
+    return pd.DataFrame({
+        'id': arrays['ids'][entity].astype(object),
+        'day': columns['day'].astype('datetime64[D]').astype('datetime64[s]'),
+        **{metric: columns[metric] for metric in metrics}
+    })
+
+
+def save_snapshots(snapshots, path: str):
+    """
+    Save the snapshot store as a compressed .npz file.
+
+    Args:
+        snapshots (dict): The store as returned by `load_snapshots`.
+        path (str): Path of the file.
+    """
+    arrays = {'meta': np.array(json.dumps(snapshots['meta']))}
+    for kind, metrics in METRICS.items():
+        for name, values in encode_deltas(snapshots[kind], metrics).items():
+            arrays[f'{kind}_{name}'] = values
+    np.savez_compressed(path, **arrays)
+
+
+def load_snapshots(path: str):
+    """
+    Load the snapshot store.
+
+    Args:
+        path (str): Path of the .npz file.
+
+    Returns:
+        dict: The store, empty if the file does not exist yet (see `empty_snapshots`).
+    """
+    if not os.path.exists(path):
+        return empty_snapshots()
+
+    with np.load(path) as data:
+        snapshots = {'meta': json.loads(str(data['meta']))}
+        for kind, metrics in METRICS.items():
+            arrays = {name: data[f'{kind}_{name}'] for name in ['ids', 'counts', 'day'] + metrics}
+            snapshots[kind] = decode_deltas(arrays, metrics)
+    return snapshots
+
+
+def latest_values(df, metrics):
+    """
+    Get the latest known values of every entity.
+
+    Returns:
+        dict: The metrics of the latest row per ID.
+    """
+    latest = df.sort_values('day').drop_duplicates(subset='id', keep='last')
+    return {row['id']: {metric: int(row[metric]) for metric in metrics} for row in latest.to_dict('records')}
+
+
+def fetch_statistics(api_client, kind: str, ids):
+    """
+    Retrieve only the statistics part of channels or videos, 50 IDs per request.
+
+    Args:
+        api_client: An initialized instance of the YouTube API client.
+        kind (str): Either 'channels' or 'videos'.
+        ids (list): The channel or video IDs.
+
+    Returns:
+        dict: The ETag and the statistics per ID.
+    """
+    resource = api_client.channels() if kind == 'channels' else api_client.videos()
+    statistics = {}
+
+    for i in range(0, len(ids), 50):
+        response = resource.list(
+            part='statistics',
+            id=','.join(ids[i:i + 50]),
+            maxResults=50
+        ).execute()
+
+        for item in response['items']:
+            # Hidden subscriber counts and disabled likes or comments are missing from the statistics
+            statistics[item['id']] = (item['etag'], {metric: int(item['statistics'].get(metric, 0))
+                                                    for metric in METRICS[kind]})
+    return statistics
+
+
+def append_rows(df, rows):
+    """
+    Add snapshot rows, replacing rows of the same entity and day (e.g. from a second run on one day).
+    """
+    if not rows:
+        return df
+    df = pd.concat([df, pd.DataFrame(rows).astype(df.dtypes.to_dict())], ignore_index=True)
+    return df.drop_duplicates(subset=['id', 'day'], keep='last').reset_index(drop=True)
+
+
+def take_snapshot(api_client, snapshots, handles, day=None):
+    """
+    Record today's statistics of the given channels and their videos.
+
+    Only what changed is fetched and stored: the statistics of all channels are requested in
+    batches of 50 (one quota unit each), channels with an unchanged ETag are skipped. Uploads
+    playlists are only crawled for new channels or when the videoCount changed; otherwise, if the
+    channel's viewCount changed, only the statistics of its known videos are requested.
+
+    Args:
+        api_client: An initialized instance of the YouTube API client.
+        snapshots (dict): The store as returned by `load_snapshots`, updated in place.
+        handles (list): Handles of the channels, as in dragon_channels.txt.
+        day (datetime.date, optional): The day of the snapshot, today by default.
+
+    Returns:
+        dict: The number of channels and videos with changed statistics and of crawled playlists.
+    """
+    day = pd.Timestamp(day or datetime.now().date())
+    meta = snapshots['meta']
+
+    # The channel ID and uploads playlist of a handle only need to be looked up once
+    for handle in handles:
+        if handle not in meta['handles']:
+            channel = get_channel_data_from_handle(api_client, handle)
+            meta['handles'][handle] = channel['id']
+            meta['uploads'][channel['id']] = channel['uploads']
+
+    channel_ids = list(dict.fromkeys(meta['handles'][handle] for handle in handles))
+    previous_channels = latest_values(snapshots['channels'], CHANNEL_METRICS)
+    previous_videos = latest_values(snapshots['videos'], VIDEO_METRICS)
+
+    channel_rows = []
+    crawl_channels = []
+    refresh_channels = []
+
+    for channel_id, (etag, statistics) in fetch_statistics(api_client, 'channels', channel_ids).items():
+        previous = previous_channels.get(channel_id)
+        if meta['etags'].get(channel_id) == etag and channel_id in meta['videos']:
+            continue
+        meta['etags'][channel_id] = etag
+        if previous != statistics:
+            channel_rows.append({'id': channel_id, 'day': day, **statistics})
+        if previous is None or channel_id not in meta['videos'] or previous['videoCount'] != statistics['videoCount']:
+            crawl_channels.append(channel_id)
+        elif previous['viewCount'] != statistics['viewCount']:
+            refresh_channels.append(channel_id)
+
+    video_statistics = {}
+
+    for channel_id in crawl_channels:
+        playlist_items = get_playlist_items_from_id(api_client, meta['uploads'][channel_id])
+        meta['videos'][channel_id] = [item['videoId'] for item in playlist_items]
+        for item in playlist_items:
+            if item['viewCount'] is not None:
+                video_statistics[item['videoId']] = {metric: int(item[metric]) for metric in VIDEO_METRICS}
+
+    refresh_ids = [video_id for channel_id in refresh_channels for video_id in meta['videos'][channel_id]]
+    for video_id, (etag, statistics) in fetch_statistics(api_client, 'videos', refresh_ids).items():
+        if meta['etags'].get(video_id) != etag:
+            meta['etags'][video_id] = etag
+            video_statistics[video_id] = statistics
+
+    video_rows = [{'id': video_id, 'day': day, **statistics} for video_id, statistics in video_statistics.items()
+                  if previous_videos.get(video_id) != statistics]
+
+    snapshots['channels'] = append_rows(snapshots['channels'], channel_rows)
+    snapshots['videos'] = append_rows(snapshots['videos'], video_rows)
+
+    return {
+        'channels_changed': len(channel_rows),
+        'videos_changed': len(video_rows),
+        'playlists_crawled': len(crawl_channels)
+    }
+
+
+def growth_rates(snapshots, kind='channels', metric='viewCount', days=30, as_of=None):
+    """
+    Calculate the growth of a metric over the last days for all channels or videos at once.
+
+    As rows are only stored when a value changed, the value at a date is the latest one
+    recorded on or before it.
+
+    Args:
+        snapshots (dict): The store as returned by `load_snapshots`.
+        kind (str): Either 'channels' or 'videos'.
+        metric (str): The metric, e.g. 'viewCount' or 'subscriberCount'.
+        days (int): Length of the period in days.
+        as_of (str, optional): The end of the period, the latest snapshot day by default.
+
+    Returns:
+        pandas.DataFrame: Per ID the values at the start and end of the period, the absolute
+                          growth, the growth per day and the relative growth, sorted by growth.
+    """
+    df = snapshots[kind][['id', 'day', metric]].sort_values('day')
+    end_day = pd.Timestamp(as_of) if as_of is not None else df['day'].max()
+    start_day = end_day - pd.Timedelta(days=days)
+    ids = df['id'].unique()
+
+    values = {}
+    for name, date in (('start', start_day), ('end', end_day)):
+        probe = pd.DataFrame({'id': ids, 'day': pd.Series(date, index=range(len(ids))).astype(df['day'].dtype)})
+        values[name] = pd.merge_asof(probe, df, on='day', by='id')[metric].to_numpy(dtype=float)
+
+    result = pd.DataFrame({
+        'id': ids,
+        f'{metric}_start': values['start'],
+        f'{metric}_end': values['end'],
+    })
+    result['growth'] = result[f'{metric}_end'] - result[f'{metric}_start']
+    result['growth_per_day'] = result['growth'] / days
+    result['growth_pct'] = result['growth'] / result[f'{metric}_start'].where(result[f'{metric}_start'] > 0) * 100
+
+    if kind == 'channels':
+        handles = {channel_id: handle for handle, channel_id in snapshots['meta']['handles'].items()}
+        result.insert(1, 'handle', result['id'].map(handles))
+
+    return result.sort_values('growth', ascending=False).reset_index(drop=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Take a daily statistics snapshot of YouTube channels and their videos.")
+    parser.add_argument('channel_files', nargs='+', help="Text files with one channel handle per line.")
+    parser.add_argument('--store', default='snapshots.npz', help="Path of the snapshot store (default: snapshots.npz).")
+    parser.add_argument('--token-file', default='token.pickle', help="Pickled OAuth credentials (default: token.pickle).")
+    parser.add_argument('--api-key', help="Use an API key instead of OAuth credentials.")
+    parser.add_argument('--growth', type=int, metavar='DAYS', help="Print the channels growing fastest over DAYS days.")
+    args = parser.parse_args(argv)
+
+    if args.api_key:
+        api_client = build('youtube', 'v3', developerKey=args.api_key)
+    else:
+        with open(args.token_file, 'rb') as token:
+            credentials = pickle.load(token)
+        if credentials.expired and credentials.refresh_token:
+            credentials.refresh(Request())
+        api_client = build('youtube', 'v3', credentials=credentials)
+
+    handles = []
+    for channel_file in args.channel_files:
+        with open(channel_file, 'r') as file:
+            handles.extend(handle for handle in file.read().splitlines() if handle)
+
+    snapshots = load_snapshots(args.store)
+    summary = take_snapshot(api_client, snapshots, handles)
+    save_snapshots(snapshots, args.store)
+
+    print(f"{summary['channels_changed']} channels and {summary['videos_changed']} videos changed, "
+          f"{summary['playlists_crawled']} playlists crawled.")
+
+    if args.growth:
+        print(growth_rates(snapshots, 'channels', 'viewCount', args.growth).head(20).to_string())
+
+
+if __name__ == '__main__':
+    main()
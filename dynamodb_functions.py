@@ -0,0 +1,423 @@
+# dynamodb_functions.py
+
+import time
+import boto3
+import numpy as np
+import pandas as pd
+from boto3.dynamodb.conditions import Key
+from lambda_function import decode_item, decode_dimensions, load_dimension_mappings, split_composite_key, FORMAT_ATTRIBUTE, \
+    KEY_ATTRIBUTES, get_dynamodb_pool
+
+# Global secondary indexes of the report tables (see terraform_modules/dynamodb/main.tf)
+VIDEO_DATE_INDEX = 'video_date_index'
+MONTH_INDEX = 'month_index'
+# Key of the second hash verifying matches in merge_latest_revisions (16 bytes, differs from pandas' default)
+CHECK_HASH_KEY = 'latest-revision!'
+
+
+def download_dynamodb_table(table_name):
+    """
+    Download all items of a DynamoDB table.
+
+    Args:
+        table_name (str): The name of the DynamoDB table.
+
+    Returns:
+        list: A list of dictionaries, one per item, as returned by boto3.
+    """
+    dynamodb = boto3.resource('dynamodb')
+    table = dynamodb.Table(table_name)
+
+    # Scan the entire DynamoDB table
+    response = table.scan()
+
+    # Extract items from the response
+    items = response['Items']
+
+    # Continue scanning if the table has more items
+    while 'LastEvaluatedKey' in response:
+        response = table.scan(ExclusiveStartKey=response['LastEvaluatedKey'])
+        items.extend(response['Items'])
+
+    return items
+
+
+def query_dynamodb_table(table_name, **query_kwargs):
+    """
+    Run a query against a DynamoDB table or index and collect all result pages.
+
+    Args:
+        table_name (str): The name of the DynamoDB table.
+        **query_kwargs: Arguments passed on to `Table.query`, e.g. IndexName and KeyConditionExpression.
+
+    Returns:
+        list: A list of dictionaries, one per item.
+    """
+    dynamodb = boto3.resource('dynamodb')
+    table = dynamodb.Table(table_name)
+
+    response = table.query(**query_kwargs)
+    items = response['Items']
+
+    # Continue querying if there are more result pages
+    while 'LastEvaluatedKey' in response:
+        response = table.query(ExclusiveStartKey=response['LastEvaluatedKey'], **query_kwargs)
+        items.extend(response['Items'])
+
+    return items
+
+
+def get_full_items(table_name, keys):
+    """
+    Fetch the complete items for the keys returned by a query of a keys-only index.
+
+    Args:
+        table_name (str): The name of the report table.
+        keys (list): Items holding at least composite_key and createTime.
+
+    Returns:
+        list: The complete items, in no particular order.
+    """
+    return get_dynamodb_pool().get_items(
+        table_name, [{'composite_key': key['composite_key'], 'createTime': key['createTime']} for key in keys]
+    )
+
+
+def query_video(table_name, video_id: str, start_date: str, end_date: str, keys_only=False):
+    """
+    Retrieve all rows of a video between two dates (inclusive) using the video/date index.
+
+    The index only holds the keys, the complete items are fetched from the table afterwards.
+
+    Args:
+        table_name (str): The name of the report table.
+        video_id (str): The ID of the YouTube video.
+        start_date (str): The start date in the format 'YYYY-MM-DD'.
+        end_date (str): The end date in the format 'YYYY-MM-DD'.
+        keys_only (bool): Return only the key attributes, saving the reads of the complete items.
+
+    Returns:
+        list: The matching items, all revisions included.
+    """
+    keys = query_dynamodb_table(
+        table_name,
+        IndexName=VIDEO_DATE_INDEX,
+        KeyConditionExpression=Key('video_id').eq(video_id) &
+                               Key('date').between(f"{start_date}T00:00:00Z", f"{end_date}T00:00:00Z")
+    )
+    return keys if keys_only else get_full_items(table_name, keys)
+
+
+def query_month(table_name, month: str, keys_only=False):
+    """
+    Retrieve all rows of a month using the month index.
+
+    The index only holds the keys, the complete items are fetched from the table afterwards.
+
+    Args:
+        table_name (str): The name of the report table.
+        month (str): The month in the format 'YYYY-MM'.
+        keys_only (bool): Return only the key attributes, saving the reads of the complete items.
+
+    Returns:
+        list: The matching items, all revisions included.
+    """
+    keys = query_dynamodb_table(
+        table_name,
+        IndexName=MONTH_INDEX,
+        KeyConditionExpression=Key('month').eq(month)
+    )
+    return keys if keys_only else get_full_items(table_name, keys)
+
+
+def backfill_index_keys(table_name, composite_key_cols):
+    """
+    Add the index key attributes (video_id, date and month) to items written before the indexes existed.
+
+    Items only show up in an index once they carry its key attributes, so this needs to run once
+    per report table after deploying the indexes. The values are taken from the composite key.
+
+    Args:
+        table_name (str): The name of the report table.
+        composite_key_cols (list): The columns the composite key was built from.
+
+    Returns:
+        int: The number of items updated.
+    """
+    dynamodb = boto3.resource('dynamodb')
+    table = dynamodb.Table(table_name)
+
+    # 'date' and 'month' are reserved words in DynamoDB expressions
+    scan_kwargs = {
+        'ProjectionExpression': 'composite_key, createTime, video_id, #date, #month',
+        'ExpressionAttributeNames': {'#date': 'date', '#month': 'month'}
+    }
+    updated = 0
+
+    response = table.scan(**scan_kwargs)
+    while True:
+        for item in response['Items']:
+            if all(name in item for name in ('video_id', 'date', 'month')):
+                continue
+            dimensions = split_composite_key(item['composite_key'], composite_key_cols)
+            table.update_item(
+                Key={'composite_key': item['composite_key'], 'createTime': item['createTime']},
+                UpdateExpression='SET video_id = :video_id, #date = :date, #month = :month',
+                ExpressionAttributeNames={'#date': 'date', '#month': 'month'},
+                ExpressionAttributeValues={
+                    ':video_id': dimensions['video_id'],
+                    ':date': dimensions['date'],
+                    ':month': dimensions['date'][:7]
+                }
+            )
+            updated += 1
+
+        if 'LastEvaluatedKey' not in response:
+            break
+        response = table.scan(ExclusiveStartKey=response['LastEvaluatedKey'], **scan_kwargs)
+
+    return updated
+
+
+def dynamodb_to_dataframe(items, composite_key_cols=None, metric_cols=None, decode=False):
+    """
+    Convert DynamoDB report items into a DataFrame.
+
+    Items written in the compact or packed format (see `encode_item` in lambda_function.py)
+    are expanded to the full format: the dimensions are restored from the composite key
+    and the metrics which were left out because they were zero are filled with zero. The
+    metrics (Decimal when read through boto3) become int64 columns if all their values are
+    whole numbers, float64 otherwise.
+
+    Args:
+        items (list): Items as returned by `download_dynamodb_table`.
+        composite_key_cols (list): The columns the composite key was built from, required
+                                   to decode compact and packed items.
+        metric_cols (list, optional): Metric columns which should exist in the result even
+                                      if they are zero in every item.
+        decode (bool): Replace the numeric codes of dimensions such as device_type by their
+                       names from the mapping tables, as categoricals.
+
+    Returns:
+        pandas.DataFrame: A DataFrame with one row per item.
+    """
+    compact_items = any(FORMAT_ATTRIBUTE in item for item in items)
+
+    if compact_items:
+        if composite_key_cols is None:
+            raise ValueError("composite_key_cols are required to decode compact items.")
+        items = [decode_item(item, composite_key_cols) for item in items]
+
+    df = pd.DataFrame(items)
+
+    if metric_cols is not None:
+        df = df.reindex(columns=df.columns.union(metric_cols, sort=False), fill_value=0)
+
+    if compact_items:
+        # Key attributes such as month may be missing on rows written before the indexes existed,
+        # they are not metrics and stay missing
+        key_cols = set(composite_key_cols) | set(KEY_ATTRIBUTES)
+        for col in df.columns:
+            if col in key_cols:
+                continue
+            # Numbers read through boto3 are Decimal, so the metrics are converted column by column
+            numeric = pd.to_numeric(df[col], errors='coerce')
+            if numeric.notna().sum() != df[col].notna().sum():
+                continue
+            numeric = numeric.fillna(0)
+            # Counts become integers again, other metrics floats
+            df[col] = numeric.astype('int64') if (numeric % 1 == 0).all() else numeric
+
+    if decode:
+        df = decode_dimensions(df, load_dimension_mappings())
+
+    return df
+
+
+def download_rollup_table(table_name, level='video_daily'):
+    """
+    Download a rollup table maintained during ingest, keeping the latest revision per key.
+
+    Args:
+        table_name (str): The name of the report table the rollups were built from.
+        level (str): Either 'video_daily' or 'channel_daily'.
+
+    Returns:
+        pandas.DataFrame: One row per video (or channel) and day with the summed metrics.
+    """
+    df = pd.DataFrame(download_dynamodb_table(f"{table_name}_{level}"))
+
+    if df.empty:
+        return df
+
+    # Reissued reports write a newer revision of a rollup row instead of updating it
+    df = latest_revisions(df, ['composite_key'])
+
+    return df.sort_values('composite_key').reset_index(drop=True)
+
+
+def parse_create_time(values):
+    """
+    Parse RFC 3339 creation times as returned by the YouTube Reporting API.
+
+    The API writes 0, 3, 6 or 9 fractional digits, so a column may mix several
+    formats, which a single inferred format cannot parse.
+
+    Args:
+        values (pandas.Series): The creation times as strings or datetimes.
+
+    Returns:
+        pandas.Series: The creation times as datetimes.
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):
+        # Already parsed, only the time zone is aligned
+        return values.dt.tz_localize('UTC') if values.dt.tz is None else values.dt.tz_convert('UTC')
+    return pd.to_datetime(values, format='ISO8601', utc=True)
+
+
+def latest_revisions(df, key_cols=('composite_key',), time_col='createTime'):
+    """
+    Keep only the latest revision (highest createTime) of every row.
+
+    Reissued reports add a new revision of each row. Instead of sorting the whole frame,
+    the rows are grouped by hashing the key columns and the position of the latest
+    revision per group is picked, which gives the same rows as sorting by the keys and
+    createTime (descending) followed by drop_duplicates(keep='first').
+
+    Args:
+        df (pandas.DataFrame): The rows, all revisions included.
+        key_cols (list): The columns identifying a row, e.g. ['composite_key'] or a set of dimensions.
+        time_col (str): The column holding the creation time of the revision.
+
+    Returns:
+        pandas.DataFrame: One row per key, in the original row order.
+    """
+    key_cols = list(key_cols)
+    if df.empty:
+        return df
+
+    # Positional index, so that duplicate index labels (e.g. after concat) do not matter
+    times = parse_create_time(df[time_col]).reset_index(drop=True)
+    keys = [df[col].reset_index(drop=True) for col in key_cols]
+    positions = times.groupby(keys, sort=False, dropna=False).idxmax().to_numpy()
+
+    return df.iloc[np.sort(positions)]
+
+
+def merge_latest_revisions(resolved, new_rows, key_cols=('composite_key',), time_col='createTime'):
+    """
+    Merge a batch of new rows into a frame already reduced with `latest_revisions`.
+
+    Only the resolved rows whose keys are contained in the new batch are compared, the
+    resolved frame is neither sorted nor grouped again, nor are its times parsed.
+
+    Args:
+        resolved (pandas.DataFrame): Rows holding one revision per key.
+        new_rows (pandas.DataFrame): New rows, possibly several revisions per key.
+        key_cols (list): The columns identifying a row.
+        time_col (str): The column holding the creation time of the revision.
+
+    Returns:
+        pandas.DataFrame: One row per key, the resolved rows followed by the new keys.
+    """
+    key_cols = list(key_cols)
+    new_latest = latest_revisions(new_rows, key_cols, time_col)
+    if resolved.empty or new_latest.empty:
+        return pd.concat([resolved, new_latest])
+
+    # Narrow the resolved rows down to the keys of the new batch, by hashing the key columns if
+    # there are several, and find the position of each candidate's key within the new rows
+    if len(key_cols) == 1:
+        new_keys = pd.Index(new_latest[key_cols[0]])
+        resolved_keys = resolved[key_cols[0]]
+    else:
+        new_keys = pd.Index(pd.util.hash_pandas_object(new_latest[key_cols], index=False))
+        resolved_keys = pd.util.hash_pandas_object(resolved[key_cols], index=False)
+    candidates = np.flatnonzero(resolved_keys.isin(new_keys).to_numpy())
+    candidate_rows = resolved.iloc[candidates]
+    matches = new_keys.get_indexer(resolved_keys.iloc[candidates])
+
+    if len(key_cols) > 1:
+        # A hash collision must not pair two different keys, so the pairs are checked with a second,
+        # independent hash of the candidates and the new rows only
+        candidate_check = pd.util.hash_pandas_object(candidate_rows[key_cols], index=False, hash_key=CHECK_HASH_KEY)
+        new_check = pd.util.hash_pandas_object(new_latest[key_cols], index=False, hash_key=CHECK_HASH_KEY)
+        matches[candidate_check.to_numpy() != new_check.to_numpy()[matches]] = -1
+    matched = matches >= 0
+
+    # .values gives a datetime64 array, to_numpy() would box every timezone-aware time in an object
+    candidate_times = parse_create_time(candidate_rows[time_col]).values
+    new_times = parse_create_time(new_latest[time_col]).values
+
+    # On equal createTime the row seen first (the resolved one) wins, like in latest_revisions
+    superseded = np.zeros(len(resolved), dtype=bool)
+    superseded[candidates[matched]] = new_times[matches[matched]] > candidate_times[matched]
+
+    keep_new = np.ones(len(new_latest), dtype=bool)
+    keep_new[matches[matched & ~superseded[candidates]]] = False
+
+    return pd.concat([resolved[~superseded], new_latest[keep_new]])
+
+
+def benchmark_latest_revisions(n_rows=1_000_000, revisions=3, seed=0):
+    """
+    Compare `latest_revisions` with the sort and drop_duplicates approach of analyze_dynamodb.ipynb.
+
+    Synthetic rows with the dimensions of channel_basic_a2 and their composite key are generated,
+    each key with up to `revisions` revisions. Both approaches must return the same rows, and the
+    incremental merge must be faster than `latest_revisions` on all rows, both keyed by composite_key
+    like the tables.
+
+    Args:
+        n_rows (int): Number of rows to generate.
+        revisions (int): Maximum number of revisions per key.
+        seed (int): Seed of the random generator.
+
+    Returns:
+        dict: Runtimes in seconds of both approaches and of an incremental merge of the last 10% of the rows.
+    """
+    rng = np.random.default_rng(seed)
+    n_keys = n_rows // revisions
+    key_ids = rng.integers(0, n_keys, n_rows)
+
+    dimensions = ['date', 'channel_id', 'video_id', 'live_or_on_demand', 'subscribed_status', 'country_code']
+    df = pd.DataFrame({
+        'date': pd.Timestamp('2024-01-01') + pd.to_timedelta(key_ids % 365, unit='D'),
+        'channel_id': 'UC' + pd.Series(key_ids % 3).astype(str),
+        'video_id': 'v' + pd.Series((key_ids // 365) % 200).astype(str),
+        'live_or_on_demand': np.where((key_ids // 73000) % 2 == 0, 'on_demand', 'live'),
+        'subscribed_status': np.where((key_ids // 146000) % 2 == 0, 'subscribed', 'not_subscribed'),
+        'country_code': np.array(['DE', 'US', 'GB', 'FR', 'IT'])[(key_ids // 292000) % 5],
+        'createTime': pd.Timestamp('2024-01-02') + pd.to_timedelta(rng.integers(0, revisions, n_rows), unit='D'),
+        'views': rng.integers(0, 100, n_rows)
+    })
+    df['composite_key'] = df['date'].dt.strftime('%Y-%m-%dT%H:%M:%SZ')
+    for col in dimensions[1:]:
+        df['composite_key'] = df['composite_key'] + '_' + df[col]
+
+    start = time.perf_counter()
+    notebook_df = df.sort_values(by=dimensions + ['createTime'], ascending=[True] * len(dimensions) + [False])
+    notebook_df = notebook_df.drop_duplicates(subset=dimensions, keep='first')
+    notebook_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    latest_df = latest_revisions(df)
+    latest_seconds = time.perf_counter() - start
+
+    split = int(n_rows * 0.9)
+    resolved = latest_revisions(df.iloc[:split])
+    start = time.perf_counter()
+    merged_df = merge_latest_revisions(resolved, df.iloc[split:])
+    merge_seconds = time.perf_counter() - start
+
+    # Both approaches keep rows of the original frame, so equal index labels mean equal rows
+    assert latest_df.index.sort_values().equals(notebook_df.index.sort_values())
+    assert merged_df.index.sort_values().equals(notebook_df.index.sort_values())
+    assert merge_seconds < latest_seconds, \
+        f"Merging took {merge_seconds:.2f}s, longer than resolving all rows ({latest_seconds:.2f}s)."
+
+    return {
+        'sort_drop_duplicates': notebook_seconds,
+        'latest_revisions': latest_seconds,
+        'merge_latest_revisions': merge_seconds
+    }
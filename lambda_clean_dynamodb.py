@@ -22,30 +22,35 @@ def lambda_handler(event, context):
     first_day_of_previous_month = (first_day_of_current_month - timedelta(days=1)).replace(day=1)
     first_day_of_two_months_ago = (first_day_of_previous_month - timedelta(days=1)).replace(day=1)
     
-    # Construct filter expressions for each month
-    filter_expression = (
-        "begins_with(composite_key, :current_month) OR "
-        "begins_with(composite_key, :previous_month) OR "
-        "begins_with(composite_key, :two_months_ago)"
-    )
-    
-    # Define expression attribute values for the filter expression
-    expression_attribute_values = {
-        ":current_month": {"S": current_date.strftime("%Y-%m")},
-        ":previous_month": {"S": first_day_of_previous_month.strftime("%Y-%m")},
-        ":two_months_ago": {"S": first_day_of_two_months_ago.strftime("%Y-%m")}
-    }
+    # The months to clean up, matching the 'month' attribute of the month index
+    months = [
+        current_date.strftime("%Y-%m"),
+        first_day_of_previous_month.strftime("%Y-%m"),
+        first_day_of_two_months_ago.strftime("%Y-%m")
+    ]
         
     for table_name in tables:
-        response = dynamodb.scan(
-            TableName=table_name,
-            FilterExpression=filter_expression,
-            ExpressionAttributeValues=expression_attribute_values
-        )
+        # Query the month index instead of scanning the whole table. Only the key attributes
+        # are needed, which are stored as they are in every item format (full, compact and packed)
+        items = []
+        for month in months:
+            query_kwargs = {
+                'TableName': table_name,
+                'IndexName': 'month_index',
+                'KeyConditionExpression': '#month = :month',
+                'ExpressionAttributeNames': {'#month': 'month'},
+                'ExpressionAttributeValues': {':month': {'S': month}},
+                'ProjectionExpression': 'composite_key, createTime'
+            }
+            response = dynamodb.query(**query_kwargs)
+            items.extend(response['Items'])
+            while 'LastEvaluatedKey' in response:
+                response = dynamodb.query(ExclusiveStartKey=response['LastEvaluatedKey'], **query_kwargs)
+                items.extend(response['Items'])
     
         # Group items by primary key
         items_by_key = defaultdict(list)
-        for item in response['Items']:
+        for item in items:
             primary_key = item['composite_key']['S']
             sort_key = item['createTime']['S']
             items_by_key[primary_key].append((sort_key, item))
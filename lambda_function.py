@@ -1,46 +1,129 @@
 import boto3
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+from botocore.config import Config
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from googleapiclient.discovery import build
 from googleapiclient.http import MediaIoBaseDownload
 from io import FileIO
 import os
+import tempfile
 import json
 import pandas as pd
 from decimal import Decimal
 import time
 import logging
+import hashlib
+import math
+import re
+import zlib
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
 # Configure logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-# Global variables to track the last request time and the number of requests made in the last minute
-last_request_time = 0
-requests_in_last_minute = 0
-
-# Function to track API requests and wait if approaching quota limit
-def track_and_wait():
-    global last_request_time, requests_in_last_minute
-    current_time = time.time()
-    if current_time - last_request_time < 60:
-        requests_in_last_minute += 1
-        if requests_in_last_minute >= 60:
-            time_to_wait = 75 - round(current_time - last_request_time)  # Calculate remaining time plus buffer
-            print(f"Quota limit reached. Waiting for {time_to_wait} seconds...")
-            time.sleep(time_to_wait)
-            last_request_time = current_time + time_to_wait  # Update last request time
-            requests_in_last_minute = 0
-            print("Resuming...")
-        else:
-            last_request_time = current_time
-    else:
-        last_request_time = current_time
-        requests_in_last_minute = 0
+# Number of rows uploaded between two checkpoints of a report
+CHECKPOINT_BATCH_SIZE = 500
+# Seconds kept in reserve before the Lambda timeout, enough to cover a quota wait and one batch
+DEFAULT_TIME_BUFFER_SECONDS = 120
+# Upper bound of self-triggered continuations per scheduled run
+DEFAULT_MAX_CONTINUATIONS = 10
+# Number of channels processed at the same time
+DEFAULT_MAX_WORKERS = 4
+# Reports a channel ingests before it goes to the back of the queue, so that all channels make progress
+REPORTS_PER_TURN = 2
+
+# Attributes which are kept as they are in every item format, as they are table or index keys
+KEY_ATTRIBUTES = ['composite_key', 'createTime', 'video_id', 'date', 'month']
+# Global secondary indexes of the report tables with their key attributes. They only project the keys,
+# so each index an item appears in adds one write capacity unit per write, whatever the item format
+INDEX_KEYS = {
+    'video_date_index': ['video_id', 'date'],
+    'month_index': ['month']
+}
+# Short attribute names marking compact items and holding the packed metrics
+FORMAT_ATTRIBUTE = 'fmt'
+PACKED_ATTRIBUTE = 'm'
+# Patterns of the dimension values within a composite key, other columns must not contain '_'
+COMPOSITE_KEY_PATTERNS = {
+    'date': r'\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}Z',
+    'channel_id': r'UC[\w-]{22}',
+    'video_id': r'[\w-]{11}|nan',
+    'live_or_on_demand': r'live|on_demand|nan',
+    'subscribed_status': r'subscribed|not_subscribed|nan',
+    'country_code': r'[A-Z]{2}|nan',
+    'age_group': r'AGE_\d+_\d*|nan',
+    'gender': r'[A-Z_]+|nan',
+    'playback_location_type': r'-?\d+(?:\.\d+)?|nan',
+    'traffic_source_type': r'-?\d+(?:\.\d+)?|nan',
+    'device_type': r'-?\d+(?:\.\d+)?|nan',
+    'operating_system': r'-?\d+(?:\.\d+)?|nan',
+    'sharing_service': r'-?\d+(?:\.\d+)?|nan'
+}
+NUMERIC_CODE = re.compile(r'-?\d+(?:\.\d+)?')
+
+# Rollup tables maintained during ingest, named <report table>_<level>, with the columns they are grouped by
+ROLLUP_LEVELS = {
+    'video_daily': ['date', 'channel_id', 'video_id'],
+    'channel_daily': ['date', 'channel_id']
+}
+
+# Mapping tables filled by setup_dynamodb.ipynb, translating numeric dimension codes into names
+MAPPING_TABLES = ['traffic_source_type', 'playback_location_type', 'traffic_source_detail',
+                  'device_type', 'operating_system', 'sharing_service', 'annotations_type']
+# Report columns holding numeric codes, with the mapping table used to decode them
+# (traffic_source_detail describes the detail column per traffic source type and decodes no column itself)
+DIMENSION_MAPPINGS = {
+    'traffic_source_type': 'traffic_source_type',
+    'playback_location_type': 'playback_location_type',
+    'device_type': 'device_type',
+    'operating_system': 'operating_system',
+    'sharing_service': 'sharing_service',
+    'annotation_type': 'annotations_type'
+}
+# Local copy of the mapping tables and for how long it is used before the tables are read again
+MAPPING_CACHE_FILE = os.path.join(tempfile.gettempdir(), 'dimension_mappings.json')
+MAPPING_CACHE_MAX_AGE_SECONDS = 24 * 3600
+
+# Requests allowed per minute, lowered when several processes share the quota
+quota_per_minute = 60
+
+# Class to track the API requests of one account and wait if approaching its quota limit
+class QuotaLimiter:
+    def __init__(self, requests_per_minute=None):
+        # Without an explicit limit the module-wide quota_per_minute applies
+        self.requests_per_minute = requests_per_minute
+        self.last_request_time = 0
+        self.requests_in_last_minute = 0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            current_time = time.time()
+            if current_time - self.last_request_time < 60:
+                self.requests_in_last_minute += 1
+                if self.requests_in_last_minute >= (self.requests_per_minute or quota_per_minute):
+                    time_to_wait = 75 - round(current_time - self.last_request_time)  # Calculate remaining time plus buffer
+                    print(f"Quota limit reached. Waiting for {time_to_wait} seconds...")
+                    time.sleep(time_to_wait)
+                    self.last_request_time = current_time + time_to_wait  # Update last request time
+                    self.requests_in_last_minute = 0
+                    print("Resuming...")
+                else:
+                    self.last_request_time = current_time
+            else:
+                self.last_request_time = current_time
+                self.requests_in_last_minute = 0
+
+# Limiter used when no account-specific one is given
+default_limiter = QuotaLimiter()
 
 # Function to download report from YouTube Reporting API
-def download_report(youtube_reporting, report_url, local_file):
-    track_and_wait()
+def download_report(youtube_reporting, report_url, local_file, limiter=None):
+    (limiter or default_limiter).wait()
     request = youtube_reporting.media().download(resourceName='')
     request.uri = report_url
     with FileIO(local_file, mode='wb') as fh:
@@ -60,21 +143,219 @@ def convert_float_to_decimal(value):
     else:
         return value
 
+# Function to check whether a metric value carries no information and can be left out of compact items
+def is_empty_metric(value):
+    if value is None:
+        return True
+    if isinstance(value, float) and math.isnan(value):
+        return True
+    return isinstance(value, (int, float, Decimal)) and not isinstance(value, bool) and value == 0
+
+# Function to convert a report row into a DynamoDB item of the given format
+# 'full' stores every column, 'compact' leaves out empty metrics and the dimensions contained in the
+# composite key, 'packed' additionally stores all metrics as one zlib-compressed JSON binary attribute
+def encode_item(item, composite_key_cols, item_format='full'):
+    if item_format == 'full':
+        return item
+    if item_format not in ('compact', 'packed'):
+        raise ValueError(f"Unknown item format '{item_format}'.")
+
+    # Attributes used as table or index keys stay plain
+    encoded = {name: item[name] for name in KEY_ATTRIBUTES if name in item}
+    metrics = {name: value for name, value in item.items()
+               if name not in encoded and name not in composite_key_cols and not is_empty_metric(value)}
+
+    if item_format == 'compact':
+        encoded.update(metrics)
+        encoded[FORMAT_ATTRIBUTE] = 'c'
+    else:
+        packed = {name: float(value) if isinstance(value, Decimal) else value for name, value in metrics.items()}
+        encoded[PACKED_ATTRIBUTE] = zlib.compress(json.dumps(packed, separators=(',', ':')).encode('utf-8'))
+        encoded[FORMAT_ATTRIBUTE] = 'p'
+    return encoded
+
+# Function to split a composite key back into its dimension values
+# Values may contain the separator themselves (e.g. 'not_subscribed'), so each column is matched by its pattern
+def split_composite_key(composite_key, composite_key_cols):
+    pattern = '_'.join(f"({COMPOSITE_KEY_PATTERNS.get(col, '[^_]*')})" for col in composite_key_cols)
+    match = re.fullmatch(pattern, composite_key)
+    if match is None:
+        raise ValueError(f"Composite key '{composite_key}' does not match the columns {composite_key_cols}.")
+    return dict(zip(composite_key_cols, match.groups()))
+
+# Function to convert a compact or packed DynamoDB item back into the full format
+# Left out metrics are not restored here, fill them with zero once all items are in a DataFrame
+def decode_item(item, composite_key_cols):
+    item_format = item.get(FORMAT_ATTRIBUTE)
+    if item_format is None:
+        return item
+
+    decoded = {name: value for name, value in item.items() if name not in (FORMAT_ATTRIBUTE, PACKED_ATTRIBUTE)}
+    for col, value in split_composite_key(item['composite_key'], composite_key_cols).items():
+        # Numeric codes come back as Decimal, like numbers read from DynamoDB
+        decoded.setdefault(col, Decimal(value) if NUMERIC_CODE.fullmatch(value) else value)
+
+    if item_format == 'p':
+        packed = item[PACKED_ATTRIBUTE]
+        packed = getattr(packed, 'value', packed)  # boto3 wraps binary attributes in Binary
+        decoded.update(json.loads(zlib.decompress(bytes(packed)), parse_float=Decimal, parse_int=Decimal))
+    return decoded
+
+# Function to estimate the size of a DynamoDB item in bytes following the DynamoDB sizing rules
+def estimate_item_size(item):
+    size = 0
+    for name, value in item.items():
+        size += len(name.encode('utf-8'))
+        if isinstance(value, str):
+            size += len(value.encode('utf-8'))
+        elif isinstance(value, (bytes, bytearray)):
+            size += len(value)
+        elif isinstance(value, bool) or value is None:
+            size += 1
+        else:
+            # Numbers take one byte per two significant digits plus one byte
+            digits = len(str(value).lstrip('-').replace('.', '').strip('0')) or 1
+            size += (digits + 1) // 2 + 1
+    return size
+
+# Function to compare average item size and write capacity units of the item formats for a report
+def compare_item_formats(df, composite_key_cols):
+    records = df.to_dict('records')
+    rows = []
+    for item_format in ('full', 'compact', 'packed'):
+        items = [encode_item(record, composite_key_cols, item_format) for record in records]
+        sizes = [estimate_item_size(item) for item in items]
+        # A standard write consumes one WCU per started KB
+        wcus = [math.ceil(size / 1024) for size in sizes]
+        # Plus one WCU per keys-only index entry written along with the item
+        index_wcus = [sum(all(key in item for key in keys) for keys in INDEX_KEYS.values()) for item in items]
+        rows.append({
+            'item_format': item_format,
+            'avg_item_bytes': sum(sizes) / len(sizes),
+            'avg_wcu': sum(wcus) / len(wcus),
+            'total_wcu': sum(wcus),
+            'total_wcu_with_indexes': sum(wcus) + sum(index_wcus)
+        })
+    return pd.DataFrame(rows).set_index('item_format')
+
+mappings_lock = threading.Lock()
+
+# Function to load all mapping tables, using the local cache while it is fresh
+# The returned dictionary carries a version stamp (hash of the mappings) next to the mappings themselves
+def load_dimension_mappings(cache_file=MAPPING_CACHE_FILE, max_age_seconds=MAPPING_CACHE_MAX_AGE_SECONDS, refresh=False):
+    # Concurrent ingests of several channels must neither read the tables twice nor race on the cache file
+    with mappings_lock:
+        return read_dimension_mappings(cache_file, max_age_seconds, refresh)
+
+# Function to read the mapping tables or their cache, see load_dimension_mappings
+def read_dimension_mappings(cache_file, max_age_seconds, refresh):
+    if not refresh and os.path.exists(cache_file):
+        with open(cache_file) as f:
+            cache = json.load(f)
+        if time.time() - cache['fetched_at'] < max_age_seconds:
+            return cache
+
+    # A session of its own, boto3's default session is not thread-safe
+    dynamodb = boto3.session.Session().resource('dynamodb')
+    mappings = {}
+    for table_name in MAPPING_TABLES:
+        table = dynamodb.Table(table_name)
+        response = table.scan()
+        items = response['Items']
+        while 'LastEvaluatedKey' in response:
+            response = table.scan(ExclusiveStartKey=response['LastEvaluatedKey'])
+            items.extend(response['Items'])
+        # JSON object keys are strings, the codes are converted back when decoding
+        mappings[table_name] = {str(int(item['id'])): item['name'] for item in items}
+
+    cache = {
+        'version': hashlib.sha256(json.dumps(mappings, sort_keys=True).encode('utf-8')).hexdigest()[:12],
+        'fetched_at': time.time(),
+        'mappings': mappings
+    }
+    with open(cache_file, 'w') as f:
+        json.dump(cache, f)
+    logger.info(f"Dimension mappings version {cache['version']} loaded from DynamoDB.")
+
+    return cache
+
+# Function to replace the numeric codes of all dimension columns of a DataFrame by their names
+# Each column is decoded with a single map over the whole column. As categoricals, unknown codes become
+# missing values; otherwise (e.g. for writing to DynamoDB) unknown codes are kept as they are
+def decode_dimensions(df, dimension_mappings, as_categorical=True):
+    for col, mapping_table in DIMENSION_MAPPINGS.items():
+        if col not in df.columns or mapping_table not in dimension_mappings['mappings']:
+            continue
+        codes = pd.to_numeric(df[col], errors='coerce')
+        lookup = {int(code): name for code, name in dimension_mappings['mappings'][mapping_table].items()}
+        # Values which are names already (e.g. decoded on write) are kept
+        names = codes.map(lookup).where(codes.notna(), df[col])
+        if as_categorical:
+            categories = sorted(set(lookup.values()).union(names.dropna().unique()))
+            df[col] = names.astype(pd.CategoricalDtype(categories))
+        else:
+            df[col] = names.where(names.notna(), df[col])
+    return df
+
+# Class sharing one thread-safe DynamoDB client and its connection pool between concurrent ingests
+# (boto3 resources, as used by batch_writer, must not be shared between threads)
+class DynamoDBPool:
+    def __init__(self, max_connections=4 * DEFAULT_MAX_WORKERS):
+        self.client = boto3.session.Session().client('dynamodb', config=Config(max_pool_connections=max_connections))
+        self.serializer = TypeSerializer()
+        self.deserializer = TypeDeserializer()
+
+    def put_items(self, table_name, items):
+        # batch_write_item accepts at most 25 items per request
+        for i in range(0, len(items), 25):
+            request_items = {table_name: [
+                {'PutRequest': {'Item': {name: self.serializer.serialize(value) for name, value in item.items()}}}
+                for item in items[i:i + 25]
+            ]}
+            retries = 0
+            while request_items:
+                response = self.client.batch_write_item(RequestItems=request_items)
+                request_items = response.get('UnprocessedItems')
+                if request_items:
+                    # Back off when throttled before retrying the unprocessed items
+                    time.sleep(min(0.05 * 2 ** retries, 5))
+                    retries += 1
+
+    def get_items(self, table_name, keys):
+        items = []
+        # batch_get_item accepts at most 100 keys per request
+        for i in range(0, len(keys), 100):
+            request_items = {table_name: {'Keys': [
+                {name: self.serializer.serialize(value) for name, value in key.items()} for key in keys[i:i + 100]
+            ]}}
+            while request_items:
+                response = self.client.batch_get_item(RequestItems=request_items)
+                for item in response.get('Responses', {}).get(table_name, []):
+                    items.append({name: self.deserializer.deserialize(value) for name, value in item.items()})
+                request_items = response.get('UnprocessedKeys')
+        return items
+
+# Pool shared by all ingests of this process, kept across warm invocations
+dynamodb_pool = None
+
+# Function to get the shared DynamoDB pool, creating it on first use
+def get_dynamodb_pool():
+    global dynamodb_pool
+    if dynamodb_pool is None:
+        dynamodb_pool = DynamoDBPool()
+    return dynamodb_pool
+
 # Function to upload data to DynamoDB
-def upload_to_table(df, table_name):
-    dynamodb = boto3.resource('dynamodb')
-    table = dynamodb.Table(table_name)
-    with table.batch_writer() as batch:
-        for _, row in df.iterrows():
-            item = row.to_dict()
-            batch.put_item(Item=item)
+def upload_to_table(df, table_name, composite_key_cols=(), item_format='full', pool=None):
+    items = [encode_item(item, composite_key_cols, item_format) for item in df.to_dict('records')]
+    (pool or get_dynamodb_pool()).put_items(table_name, items)
 
 
 # Function to retrieve OAuth credentials from AWS Systems Manager Parameter Store
 def get_oauth_token(parameter_name, aws_region):
 
-    # Create a Systems Manager client
-    ssm_client = boto3.client('ssm', region_name=aws_region)
+    # Create a Systems Manager client, from its own session as boto3's default session is not thread-safe
+    ssm_client = boto3.session.Session().client('ssm', region_name=aws_region)
 
     # Retrieve the parameter value
     response = ssm_client.get_parameter(Name=parameter_name, WithDecryption=True)
@@ -85,9 +366,9 @@ def get_oauth_token(parameter_name, aws_region):
 
     return secret_dict
 
-# Function to authenticate with YouTube Reporting API using OAuth credentials
-def authenticate_youtube_reporting(secret_name, aws_region):
-    
+# Function to retrieve valid OAuth credentials, refreshing and storing them again if expired
+def get_credentials(secret_name, aws_region):
+
     credentials = None
     credentials_dict = get_oauth_token(secret_name, aws_region)
 
@@ -100,103 +381,313 @@ def authenticate_youtube_reporting(secret_name, aws_region):
             # Refresh the credentials
             credentials.refresh(Request())
 
-            ssm_client = boto3.client('ssm', region_name=aws_region)
+            ssm_client = boto3.session.Session().client('ssm', region_name=aws_region)
             ssm_client.put_parameter(Name=secret_name,
                                                 Value=credentials.to_json(),
                                                 Type='SecureString',
                                                 Overwrite=True)
     else:
         # If credentials are not available, initiate the authentication flow
-        raise("Credentials are not available.")
-        
-    # Build and return the YouTube Reporting API object
-    youtube_reporting = build('youtubereporting', 'v1', credentials=credentials)
-    return youtube_reporting
-
-# Main function to process reports
-def process_reports(job_id, table_name, composite_key_cols, decimal_cols, youtube_client):
-    track_and_wait()
-    reports_result = youtube_client.jobs().reports().list(jobId=job_id).execute()
-
-    dynamodb = boto3.resource('dynamodb')
-
-    available_report_ids = [report['id'] for report in reports_result['reports']]
-    ids_to_retrieve = [{'id': key} for key in available_report_ids]
-
-    response = dynamodb.batch_get_item(
-    RequestItems={
-        'reports': {
-            'Keys': ids_to_retrieve
-            }
-            }
-    )
-
-    # Check if any items are returned
-    if 'Responses' in response:
-        items = response['Responses']['reports']
-        existing_reports = [item['id'] for item in items]
-    else:
-        logger.info("No items returned for the specified keys.")
-        existing_reports = []
-    
-    new_reports = [report['id'] for report in reports_result['reports'] if report['id'] not in existing_reports]
-
-    total_rows_added = 0
-    
-    for report in reports_result['reports']:
-        if report['id'] in new_reports:
-            local_file = f"/tmp/{report['id']}.csv"
-            download_report(youtube_client, report['downloadUrl'], local_file)
-            #logger.info(f"Report {report['id']} downloaded successfully.")
-            df = pd.read_csv(local_file)
-            if not df.empty:
-                #logger.info(f"Processing DataFrame for report {report['id']}...")
-                df['createTime'] = report['createTime']
-                df['date'] = convert_date(df['date'])
-                df['video_id'] = df['video_id'].astype(str)
-                df['composite_key'] = df[composite_key_cols].astype(str).agg('_'.join, axis=1)
-                for col in decimal_cols:
-                    df[col] = df[col].apply(convert_float_to_decimal)
-
-                total_rows_added += len(df)
-                #logger.info(f"Preprocessing DataFrame for report {report['id']} done.")
-                upload_to_table(df, table_name)
-                #logger.info(f"Report {report['id']} uploaded to DynamoDB table {table_name}.")
-
-                #when finished upload report to reports table
-                table = dynamodb.Table('reports')
-                with table.batch_writer() as batch:
-                    batch.put_item(Item=report)
-                logger.info(f"Report {report['id']} processed and uploaded successfully.")
-            #else:
-                #logger.info(f"No data found in report {report['id']}. Skipping processing.")
-            # Remove the file after processing
-            os.remove(local_file)
-            #logger.info(f"Temporary file {local_file} removed.")
-    logger.info(f"Processing of Reports for {table_name} completed. {total_rows_added} new records added.")              
-
+        raise ValueError("Credentials are not available.")
+
+    return credentials
+
+# Refreshed credentials and API clients per channel entry, kept across warm invocations
+reporting_clients = {}
+# One lock per channel entry, so that channels authenticate concurrently; clients_lock only guards the dictionaries
+client_locks = {}
+clients_lock = threading.Lock()
+
+# Function to get the YouTube Reporting API client of a channel, authenticating only if the cached token expired
+# The cache is keyed per channel entry, not per secret: API clients are not thread-safe, so two entries
+# sharing a secret must not share a client
+def get_reporting_client(secret_name, aws_region, channel_key=None):
+    key = (channel_key, secret_name, aws_region)
+    with clients_lock:
+        key_lock = client_locks.setdefault(key, threading.Lock())
+
+    with key_lock:
+        cached = reporting_clients.get(key)
+        if cached is None or not cached[0].valid:
+            credentials = get_credentials(secret_name, aws_region)
+            cached = (credentials, build('youtubereporting', 'v1', credentials=credentials))
+            with clients_lock:
+                reporting_clients[key] = cached
+    return cached[1]
+
+# Function to list all reports of a job, following the pagination of the API
+def list_reports(youtube_client, job_id, limiter=None):
+    reports = []
+    page_token = None
+    while True:
+        (limiter or default_limiter).wait()
+        reports_result = youtube_client.jobs().reports().list(jobId=job_id, pageToken=page_token).execute()
+        reports.extend(reports_result.get('reports', []))
+        page_token = reports_result.get('nextPageToken')
+        if not page_token:
+            break
+    return reports
+
+# Function to build a check whether the current invocation still has time left for more work
+def make_time_check(context, time_buffer_seconds):
+    # Without a Lambda context (e.g. local runs) there is no deadline
+    if context is None:
+        return lambda: True
+    return lambda: context.get_remaining_time_in_millis() > time_buffer_seconds * 1000
+
+# Function to retrieve the entries of the reports table for the given report ids
+def get_report_checkpoints(pool, report_ids):
+    return {item['id']: item for item in pool.get_items('reports', [{'id': key} for key in report_ids])}
+
+# Function to check whether a report has been fully uploaded
+# Entries written before checkpointing existed carry no status and are complete
+def is_report_done(checkpoint):
+    return checkpoint is not None and checkpoint.get('status', 'done') == 'done'
+
+# Function to list the reports of a job which have not been fully ingested yet, with their checkpoints
+def list_pending_reports(youtube_client, job_id, pool, limiter=None):
+    reports = list_reports(youtube_client, job_id, limiter)
+    checkpoints = get_report_checkpoints(pool, [report['id'] for report in reports])
+    return [(report, checkpoints.get(report['id'])) for report in reports
+            if not is_report_done(checkpoints.get(report['id']))]
+
+# Function to add the key columns to a downloaded report and convert its values for DynamoDB
+def prepare_report(df, report, composite_key_cols, decimal_cols):
+    df['createTime'] = report['createTime']
+    df['date'] = convert_date(df['date'])
+    df['video_id'] = df['video_id'].astype(str)
+    df['composite_key'] = df[composite_key_cols].astype(str).agg('_'.join, axis=1)
+    # Partition key of the month index, e.g. '2024-02'
+    df['month'] = df['date'].str[:7]
+    for col in decimal_cols:
+        df[col] = df[col].apply(convert_float_to_decimal)
+    return df
+
+# Function to sum the additive metrics of a prepared report per video and day and per channel and day
+# Each rollup row is keyed like a report row (composite_key and createTime of the report), so a reissued
+# report writes a newer revision instead of adding to the old sums, and repeated writes are idempotent
+def build_rollups(df, rollup_metrics):
+    rollups = {}
+    metrics = df[rollup_metrics].astype(float)
+    for level, group_cols in ROLLUP_LEVELS.items():
+        rollup = metrics.groupby([df[col] for col in group_cols + ['createTime']]).sum().reset_index()
+        rollup['composite_key'] = rollup[group_cols].astype(str).agg('_'.join, axis=1)
+        rollup['month'] = rollup['date'].str[:7]
+        for col in rollup_metrics:
+            # Counts stay integers, sums of fractional metrics become Decimal like in the report tables
+            if (rollup[col] % 1 == 0).all():
+                rollup[col] = rollup[col].astype('int64')
+            else:
+                rollup[col] = rollup[col].apply(convert_float_to_decimal)
+        rollups[level] = rollup
+    return rollups
+
+# Function to download a single report and upload its rows in batches, checkpointing the row offset
+def ingest_report(report, table_name, composite_key_cols, decimal_cols, youtube_client, pool,
+                  checkpoint=None, has_time_left=lambda: True, item_format='full', rollup_metrics=None,
+                  decode_on_write=False, limiter=None):
+    rows_done = int(checkpoint.get('rows_uploaded', 0)) if checkpoint else 0
+    rows_added = 0
+
+    local_file = os.path.join(tempfile.gettempdir(), f"{report['id']}.csv")
+    download_report(youtube_client, report['downloadUrl'], local_file, limiter)
+    df = pd.read_csv(local_file)
+    # Remove the file right away, a resumed run downloads the report again
+    os.remove(local_file)
+
+    if df.empty:
+        # Record empty reports as well, otherwise every run would download them again
+        pool.put_items('reports', [report])
+        logger.info(f"Report {report['id']} is empty.")
+        return rows_added, True
+
+    df = prepare_report(df, report, composite_key_cols, decimal_cols)
+    # The composite key keeps the codes, only the dimension attributes are written as names
+    if decode_on_write:
+        df = decode_dimensions(df, load_dimension_mappings(), as_categorical=False)
+
+    if rows_done:
+        logger.info(f"Resuming report {report['id']} at row {rows_done} of {len(df)}.")
+
+    for start in range(rows_done, len(df), CHECKPOINT_BATCH_SIZE):
+        if not has_time_left():
+            logger.info(f"Time budget exhausted, report {report['id']} stopped at row {start} of {len(df)}.")
+            return rows_added, False
+        batch_df = df.iloc[start:start + CHECKPOINT_BATCH_SIZE]
+        upload_to_table(batch_df, table_name, composite_key_cols, item_format, pool)
+        rows_added += len(batch_df)
+        # Record the offset so that a later run continues after the rows already written
+        pool.put_items('reports', [{**report, 'status': 'in_progress', 'rows_uploaded': start + len(batch_df)}])
+
+    # Rollups are rewritten as a whole from the complete report, so a resumed run does not count rows twice
+    if rollup_metrics:
+        for level, rollup in build_rollups(df, rollup_metrics).items():
+            upload_to_table(rollup, f"{table_name}_{level}", pool=pool)
+
+    #when finished upload report to reports table, replacing the checkpoint
+    pool.put_items('reports', [report])
+    logger.info(f"Report {report['id']} processed and uploaded successfully.")
+
+    return rows_added, True
+
+# Function to ingest a report with the options of its job
+def ingest_job_report(report, params, youtube_client, pool, checkpoint=None, has_time_left=lambda: True, limiter=None):
+    return ingest_report(report, params['table_name'], params['composite_key_cols'], params['decimal_cols'],
+                         youtube_client, pool, checkpoint, has_time_left, params.get('item_format', 'full'),
+                         params.get('rollup_metrics'), params.get('decode_dimensions', False), limiter)
+
+# Function to read the channels to process from the payload
+# Besides a list of channels, each with its own secret and jobs, the single-channel payload is still accepted
+def get_channels(event):
+    if 'channels' in event:
+        return event['channels']
+    return [{
+        'secret_name': event.get('secret_name', ''),
+        'aws_region': event.get('aws_region', ''),
+        'jobs': event.get('jobs', {})
+    }]
+
+# Function to name the channel entries of a payload, numbering entries with the same name or secret
+def get_channel_names(channels):
+    names = [channel.get('name', channel['secret_name']) for channel in channels]
+    seen = {}
+    unique_names = []
+    for name in names:
+        seen[name] = seen.get(name, 0) + 1
+        unique_names.append(name if names.count(name) == 1 else f"{name}#{seen[name]}")
+    return unique_names
+
+# Function to run one turn of a channel: on the first turn its pending reports are listed,
+# afterwards up to REPORTS_PER_TURN reports are ingested. Returns True if the channel has work left
+def run_channel_turn(state, pool, has_time_left):
+    channel = state['channel']
+
+    if state['backlog'] is None:
+        state['client'] = get_reporting_client(channel['secret_name'], channel['aws_region'], state['name'])
+        state['backlog'] = deque()
+        for job_id in channel['jobs']:
+            pending_reports = list_pending_reports(state['client'], job_id, pool, state['limiter'])
+            state['backlog'].extend((job_id, report, checkpoint) for report, checkpoint in pending_reports)
+        logger.info(f"{state['name']}: {len(state['backlog'])} reports to process.")
+        return bool(state['backlog'])
+
+    for _ in range(REPORTS_PER_TURN):
+        if not state['backlog'] or not has_time_left():
+            break
+        job_id, report, checkpoint = state['backlog'][0]
+        rows_added, completed = ingest_job_report(report, channel['jobs'][job_id], state['client'], pool,
+                                                  checkpoint, has_time_left, state['limiter'])
+        state['rows_added'] += rows_added
+        if not completed:
+            # The report stays first in the backlog, its checkpoint is stored in the reports table
+            break
+        state['backlog'].popleft()
+
+    if not state['backlog']:
+        logger.info(f"{state['name']}: processing completed. {state['rows_added']} new records added.")
+    return bool(state['backlog'])
+
+# Function to process several channels concurrently
+# Channels take turns in round-robin order, and a channel is never processed by two threads at once
+# as its API client is not thread-safe. Each channel has its own API client and quota limiter,
+# all of them share one DynamoDB pool
+def ingest_channels(channels, pool, has_time_left, max_workers=DEFAULT_MAX_WORKERS):
+    states = [{
+        'name': name,
+        'channel': channel,
+        'client': None,
+        'limiter': QuotaLimiter(),
+        'backlog': None,
+        'rows_added': 0,
+        'error': None
+    } for name, channel in zip(get_channel_names(channels), channels)]
+
+    queue = deque(states)
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while queue or running:
+            while queue and len(running) < max_workers and has_time_left():
+                state = queue.popleft()
+                running[executor.submit(run_channel_turn, state, pool, has_time_left)] = state
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                state = running.pop(future)
+                try:
+                    if future.result():
+                        queue.append(state)
+                except Exception as e:
+                    # One failing channel must not stop the others
+                    logger.exception(f"An error occurred for {state['name']}:")
+                    state['error'] = e
+
+    return states
+
+# Function to collect the channels with work left, each with only the jobs that still have reports to process
+def get_remaining_channels(states):
+    remaining_channels = []
+    for state in states:
+        if state['error'] is not None:
+            continue
+        if state['backlog'] is None:
+            remaining_channels.append(state['channel'])
+        elif state['backlog']:
+            job_ids = dict.fromkeys(job_id for job_id, _, _ in state['backlog'])
+            remaining_channels.append({**state['channel'],
+                                       'jobs': {job_id: state['channel']['jobs'][job_id] for job_id in job_ids}})
+    return remaining_channels
+
+# Function to hand the remaining channels over to a new asynchronous invocation of this function
+def trigger_continuation(event, remaining_channels, context):
+    continuation = event.get('continuation', 0) + 1
+    if context is None or continuation > event.get('max_continuations', DEFAULT_MAX_CONTINUATIONS):
+        logger.info("No continuation triggered, remaining reports will be processed in the next scheduled run.")
+        return False
+
+    lambda_client = boto3.client('lambda')
+    lambda_client.invoke(FunctionName=context.invoked_function_arn,
+                         InvocationType='Event',
+                         Payload=json.dumps({**event, 'channels': remaining_channels, 'continuation': continuation}))
+    logger.info(f"Triggered continuation {continuation} for {len(remaining_channels)} remaining channels.")
+    return True
 
 
 def lambda_handler(event, context):
-    # Access the jobs dictionary from the event payload
-    jobs = event.get('jobs', {})
-    secret_name = event.get('secret_name', '')
-    aws_region = event.get('aws_region', '')
-
-    logger.info('Hello! I will now retrieve and process your YouTube reports!')
-
-    #initiate the connection
-    youtube_reporting = authenticate_youtube_reporting(secret_name, aws_region)
+    # Access the channels, each with its secret and jobs dictionary, from the event payload
+    channels = get_channels(event)
+    has_time_left = make_time_check(context, event.get('time_buffer_seconds', DEFAULT_TIME_BUFFER_SECONDS))
 
-    # Process reports for each job
-    for job_id, params in jobs.items():
-        try:
-            process_reports(job_id, params['table_name'], params['composite_key_cols'], params['decimal_cols'], youtube_reporting)
+    logger.info(f'Hello! I will now retrieve and process your YouTube reports for {len(channels)} channel(s)!')
 
-        except Exception as e:
-            logger.exception('An error occurred:')
-            raise  # Re-raise the exception to ensure Lambda handles it
+    states = ingest_channels(channels, get_dynamodb_pool(), has_time_left,
+                             event.get('max_workers', DEFAULT_MAX_WORKERS))
 
-    return { 
+    result = { 
         'message' : 'Reports retrieved and new ones loaded to DynamoDB.'
     }
+
+    continued = False
+    remaining_channels = get_remaining_channels(states)
+    if remaining_channels:
+        continued = trigger_continuation(event, remaining_channels, context)
+        result = {
+            'message': 'Time budget exhausted, progress checkpointed.',
+            'remaining_channels': [channel.get('name', channel['secret_name']) for channel in remaining_channels],
+            'continued': continued
+        }
+
+    failed_channels = [state['name'] for state in states if state['error'] is not None]
+    if failed_channels:
+        message = f"Processing failed for {', '.join(failed_channels)}."
+        if continued:
+            # An asynchronous retry would rerun the original event and start a second continuation chain
+            # ingesting the same reports, so the failure is only logged and returned
+            logger.error(message)
+            result['failed_channels'] = failed_channels
+        else:
+            # Raise to ensure Lambda reports the failure
+            raise RuntimeError(message)
+
+    return result
@@ -15,6 +15,12 @@ variable "token" {
   description = "Provide the desired name of your Oauth token in Secrets Manager."
 }
 
+variable "additional_tokens" {
+  type = list(string)
+  default = []
+  description = "Names of the Oauth tokens of further channels processed by the same function, if any."
+}
+
 variable "email" {
   type = string
   description = "Please enter the e-mail address which should receive error notifications."
@@ -29,11 +35,13 @@ data "aws_caller_identity" "current" {}
 module "dynamodb" {
   source = "./terraform_modules/dynamodb"
   reports = ["channel_basic_a2", "channel_combined_a2", "channel_demographics_a1", "channel_sharing_service_a1"]
+  rollups = ["channel_basic_a2"]
 }
 
 module "secret" {
   source = "./terraform_modules/parameter_store"
   token = var.token
+  additional_tokens = var.additional_tokens
 }
 
 module "lambda" {
@@ -41,7 +49,7 @@ module "lambda" {
   bucket = var.bucket
   table_arns = module.dynamodb.table_arns
   depends_on = [ module.dynamodb, module.secret ]
-  secret_arn = module.secret.secret_arn
+  secret_arns = module.secret.secret_arns
   email = var.email
   account_id = data.aws_caller_identity.current.account_id
 }
@@ -20,6 +20,82 @@ resource "aws_dynamodb_table" "report_tables" {
     name = "createTime"
     type = "S"
   }
+
+  attribute {
+    name = "video_id"
+    type = "S"
+  }
+
+  attribute {
+    name = "date"
+    type = "S"
+  }
+
+  attribute {
+    name = "month"
+    type = "S"
+  }
+
+  # all rows of a video within a date range
+  # the indexes only project the keys, so that they add a single write unit per row whatever its size
+  global_secondary_index {
+    name = "video_date_index"
+    hash_key = "video_id"
+    range_key = "date"
+    projection_type = "KEYS_ONLY"
+  }
+
+  # all rows of a month (e.g. "2024-02"), ordered by report creation
+  global_secondary_index {
+    name = "month_index"
+    hash_key = "month"
+    range_key = "createTime"
+    projection_type = "KEYS_ONLY"
+  }
+}
+
+# rollup tables with daily sums per video and per channel, maintained during ingest
+
+variable "rollups" {
+  type = list(string)
+  default = []
+}
+
+locals {
+  rollup_tables = flatten([for report in var.rollups : ["${report}_video_daily", "${report}_channel_daily"]])
+}
+
+resource "aws_dynamodb_table" "rollup_tables" {
+  count = length(local.rollup_tables)
+
+  name = local.rollup_tables[count.index]
+  billing_mode = "PAY_PER_REQUEST"
+  
+  hash_key = "composite_key"
+  range_key = "createTime"
+
+  attribute {
+    name = "composite_key"
+    type = "S"
+  }
+
+  attribute {
+    name = "createTime"
+    type = "S"
+  }
+
+  attribute {
+    name = "month"
+    type = "S"
+  }
+
+  # used by the monthly clean-up
+  global_secondary_index {
+    name = "month_index"
+    hash_key = "month"
+    range_key = "createTime"
+    projection_type = "KEYS_ONLY"
+  }
 }
 
 resource "aws_dynamodb_table" "jobs_table" {
@@ -35,10 +111,6 @@ resource "aws_dynamodb_table" "jobs_table" {
   }
 }
 
-output "table_arns" {
-  value = concat([for i in range(length(var.reports)) : aws_dynamodb_table.report_tables[i].arn], [aws_dynamodb_table.jobs_table.arn])
-}
-
 # now for the mapping tables
 
 variable "mappings" {
@@ -60,3 +132,10 @@ resource "aws_dynamodb_table" "mapping_tables" {
     type = "N"
   }
 }
+
+output "table_arns" {
+  value = concat([for i in range(length(var.reports)) : aws_dynamodb_table.report_tables[i].arn],
+                 [for i in range(length(local.rollup_tables)) : aws_dynamodb_table.rollup_tables[i].arn],
+                 [aws_dynamodb_table.jobs_table.arn],
+                 [for i in range(length(var.mappings)) : aws_dynamodb_table.mapping_tables[i].arn])
+}
@@ -6,8 +6,8 @@ variable "table_arns" {
   type = list(string)
 }
 
-variable "secret_arn" {
-  type = string
+variable "secret_arns" {
+  type = list(string)
 }
 
 
@@ -57,7 +57,7 @@ resource "aws_iam_policy" "dynamodb_batch_access" {
 				"dynamodb:UpdateTable",
 				"dynamodb:GetRecords"
 			],
-			"Resource": var.table_arns
+			"Resource": concat(var.table_arns, [for arn in var.table_arns : "${arn}/index/*"])
 		},
 		{
 			"Sid": "VisualEditor1",
@@ -83,7 +83,25 @@ resource "aws_iam_policy" "secret_access" {
 				"ssm:GetParameter", 
         "ssm:PutParameter"
 			],
-			"Resource": var.secret_arn
+			"Resource": var.secret_arns
+		}
+	]
+})
+}
+
+# allow the processing function to trigger a continuation of itself when its time budget runs out
+
+resource "aws_iam_policy" "self_invoke" {
+  name        = "Lambda-Self-Invoke"
+  description = "Policy for the processing function to asynchronously invoke itself"
+
+  policy      = jsonencode({
+	"Version": "2012-10-17",
+	"Statement": [
+		{
+			"Effect": "Allow",
+			"Action": "lambda:InvokeFunction",
+			"Resource": "arn:aws:lambda:*:${var.account_id}:function:DailyProcessing"
 		}
 	]
 })
@@ -153,6 +171,11 @@ resource "aws_iam_role_policy_attachment" "attach_secret_access_process" {
   policy_arn = aws_iam_policy.secret_access.arn
 }
 
+resource "aws_iam_role_policy_attachment" "attach_self_invoke_process" {
+  role       = aws_iam_role.lambda_process_role.name
+  policy_arn = aws_iam_policy.self_invoke.arn
+}
+
 output "lambda_process_role_name" {
   value = aws_iam_role.lambda_process_role.name
 }
@@ -15,14 +15,14 @@ variable "table_arns" {
   type = list(string)
 }
 
-variable "secret_arn" {
-  type = string
+variable "secret_arns" {
+  type = list(string)
 }
 
 module "iam_module" {
   source = "./iam_module"
   table_arns = var.table_arns
-  secret_arn = var.secret_arn
+  secret_arns = var.secret_arns
   account_id = var.account_id
 }
 
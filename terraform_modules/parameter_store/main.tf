@@ -2,6 +2,11 @@ variable "token" {
   type = string
 }
 
+variable "additional_tokens" {
+  type = list(string)
+  default = []
+}
+
 resource "aws_ssm_parameter" "token" {
   name        = var.token
   value       = ""
@@ -9,6 +14,15 @@ resource "aws_ssm_parameter" "token" {
   description = "My token"
 }
 
-output "secret_arn" {
-  value = aws_ssm_parameter.token.arn
+# tokens of further channels processed by the same function
+resource "aws_ssm_parameter" "additional_token" {
+  for_each    = toset(var.additional_tokens)
+  name        = each.value
+  value       = ""
+  type        = "SecureString"
+  description = "Token of an additional channel"
+}
+
+output "secret_arns" {
+  value = concat([aws_ssm_parameter.token.arn], [for token in var.additional_tokens : aws_ssm_parameter.additional_token[token].arn])
 }
\ No newline at end of file